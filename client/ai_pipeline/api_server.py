@@ -21,33 +21,54 @@ Notes:
   (true NDVI/EVI typically require NIR; for RGB we use proxies).
 - Results are saved to ai_pipeline/results/<session_id>.json
 - Uploaded files are saved under ai_pipeline/uploads
+- Run directly to serve with waitress (AI_SERVER_THREADS worker threads), or
+  under gunicorn: gunicorn -w 4 --threads 2 api_server:app
+  (without TBB/OpenMP, Numba kernel launches are serialized across threads)
 """
 from __future__ import annotations
 
 import base64
-import io
+import contextlib
+import functools
 import json
+import math
+import mimetypes
 import os
+import struct
+import threading
 import uuid
-from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
 from typing import Dict, Any, Tuple, Optional
 
 import numpy as np
 from flask import Flask, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
-# Try to use OpenCV if available for robust decoding; fall back to PIL
+# OpenCV handles both decoding and encoding
+import cv2  # type: ignore
+
+# Numba fuses the per-pixel index math into one pass; numexpr/NumPy are fallbacks
+try:
+    from numba import njit, prange, threading_layer  # type: ignore
+    HAS_NUMBA = True
+except Exception:
+    HAS_NUMBA = False
+
+# orjson serializes the (large, base64-heavy) results much faster than json
 try:
-    import cv2  # type: ignore
-    HAS_CV2 = True
+    import orjson  # type: ignore
+    HAS_ORJSON = True
 except Exception:
-    HAS_CV2 = False
+    HAS_ORJSON = False
 
+# numexpr fuses each index expression when Numba is unavailable
 try:
-    from PIL import Image  # type: ignore
-    HAS_PIL = True
+    import numexpr as ne  # type: ignore
+    HAS_NUMEXPR = True
 except Exception:
-    HAS_PIL = False
+    HAS_NUMEXPR = False
 
 # ----------------------------------------------------------------------------
 # Paths and app setup
@@ -59,110 +80,308 @@ RESULTS_DIR = os.path.join(BASE_DIR, 'results')
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 (os.makedirs(RESULTS_DIR, exist_ok=True))
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for request parsing and jsonify.
+
+    Differences from Flask's default provider:
+    - keys are not sorted; output keeps dict insertion order
+    - dicts with non-`str` keys are rejected
+    - `dumps`/`loads` keyword arguments (`indent`, `sort_keys`, ...) are ignored
+
+    `date`/`datetime` values are passed through to Flask's `default`, so they
+    still serialize as HTTP dates rather than orjson's RFC 3339 strings.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(
+            obj, default=self.default, option=orjson.OPT_PASSTHROUGH_DATETIME
+        ).decode('utf-8')
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+if HAS_ORJSON:
+    app.json = ORJSONProvider(app)
 CORS(app)
 
+# Worker pool for request-path decode/compute (see _map_pair)
+_POOL = ThreadPoolExecutor(max_workers=4)
+
+# Separate pool for persisting uploads so disk writes never queue ahead of
+# another request's compute on _POOL
+_IO_POOL = ThreadPoolExecutor(max_workers=2)
+
 EPS = 1e-6
+INV_255 = np.float32(1.0 / 255.0)
+
+# Optional cap on the long edge used for index statistics (0, the default,
+# analyses at full resolution). Downsampling is opt-in: the FVC/LAI means are
+# small, so change_pct and the impact score are sensitive to resampling
+ANALYSIS_MAX_EDGE = int(os.getenv('AI_ANALYSIS_MAX_EDGE', '0'))
+
+# OpenCV >= 4.10 can decode straight to RGB, skipping the BGR->RGB pass
+HAS_IMREAD_RGB = hasattr(cv2, 'IMREAD_COLOR_RGB')
+
+# Reduced-scale JPEG decode flags, largest reduction first
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Quality for previews that have to be re-encoded (see _to_data_url)
+JPEG_QUALITY = 85
 
 # ----------------------------------------------------------------------------
 # Utilities
 # ----------------------------------------------------------------------------
 
-def _to_rgb_array_from_bytes(data: bytes) -> np.ndarray:
-    """Decode image bytes into an RGB numpy array (H, W, 3), float32 in [0, 1]."""
-    if HAS_CV2:
-        arr = np.frombuffer(data, dtype=np.uint8)
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError('Failed to decode image bytes with OpenCV')
-        # OpenCV decodes as BGR; convert to RGB
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    elif HAS_PIL:
-        with Image.open(io.BytesIO(data)) as im:
-            im = im.convert('RGB')
-            img = np.array(im)
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read (height, width) from a JPEG's SOF header, or None if not a JPEG."""
+    if data[:2] != b'\xff\xd8':
+        return None
+    i = 2
+    n = len(data)
+    while i + 9 <= n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        # SOF0..SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            h, w = struct.unpack('>HH', data[i + 5:i + 9])
+            return h, w
+        (length,) = struct.unpack('>H', data[i + 2:i + 4])
+        i += 2 + length
+    return None
+
+
+def _reduced_decode_flag(data: bytes) -> Optional[int]:
+    """Pick an IMREAD_REDUCED_COLOR_* flag for oversize JPEGs.
+
+    libjpeg can decode at 1/2, 1/4 or 1/8 scale via IDCT scaling, which is
+    much cheaper than a full decode. The largest factor that still leaves the
+    long edge at or above ANALYSIS_MAX_EDGE is chosen, so the statistics see
+    the same resolution they would after `_downsample_for_analysis`.
+    """
+    if ANALYSIS_MAX_EDGE <= 0:
+        return None
+    size = _jpeg_size(data)
+    if size is None:
+        return None
+    long_edge = max(size)
+    for factor, flag in _REDUCED_FLAGS:
+        if long_edge // factor >= ANALYSIS_MAX_EDGE:
+            return flag
+    return None
+
+
+def _to_rgb_array_from_bytes(data: bytes, allow_reduced: bool = True) -> np.ndarray:
+    """Decode image bytes into a contiguous RGB numpy array (H, W, 3), uint8.
+
+    With `allow_reduced`, large JPEGs are decoded at reduced scale (see
+    `_reduced_decode_flag`); pass False when the array also feeds a preview.
+    """
+    arr = np.frombuffer(data, dtype=np.uint8)
+    reduced = _reduced_decode_flag(data) if allow_reduced else None
+    if reduced is not None:
+        img = cv2.imdecode(arr, reduced)
+    elif HAS_IMREAD_RGB:
+        img = cv2.imdecode(arr, cv2.IMREAD_COLOR_RGB)
     else:
-        raise RuntimeError('Neither OpenCV nor Pillow is available for image decoding')
-
-    img = img.astype(np.float32) / 255.0
-    return img
-
-
-def _read_image_from_path(path: str) -> np.ndarray:
-    """Read image from a filesystem path into RGB float32 [0,1] array."""
-    if not os.path.isabs(path):
-        # Try a few candidate roots for relative paths
-        candidates = [
-            os.getcwd(),
-            os.path.abspath(os.path.join(os.getcwd(), '..')),
-            os.path.abspath(os.path.join(os.getcwd(), '..', 'server', 'output')),
-            BASE_DIR,
-            os.path.abspath(os.path.join(BASE_DIR, '..')),
-            os.path.abspath(os.path.join(BASE_DIR, '..', 'server', 'output')),
-        ]
-        for root in candidates:
-            candidate = os.path.join(root, path)
-            if os.path.exists(candidate):
-                path = candidate
-                break
-    if not os.path.exists(path):
-        raise FileNotFoundError(f'Image not found: {path}')
+        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError('Failed to decode image bytes with OpenCV')
+    if reduced is not None or not HAS_IMREAD_RGB:
+        # Reduced decodes and older OpenCV give BGR; convert to RGB in place
+        cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
+
+    return np.ascontiguousarray(img)
+
 
+@functools.lru_cache(maxsize=512)
+def _resolve_path(path: str, cwd: str) -> str:
+    """Find a relative image path under a few candidate roots.
+
+    `cwd` is part of the cache key because the first candidates depend on it.
+    Successful lookups are cached so repeat requests skip the stat calls;
+    misses raise and are not cached.
+    """
+    candidates = [
+        cwd,
+        os.path.abspath(os.path.join(cwd, '..')),
+        os.path.abspath(os.path.join(cwd, '..', 'server', 'output')),
+        BASE_DIR,
+        os.path.abspath(os.path.join(BASE_DIR, '..')),
+        os.path.abspath(os.path.join(BASE_DIR, '..', 'server', 'output')),
+    ]
+    for root in candidates:
+        candidate = os.path.join(root, path)
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f'Image not found: {path}')
+
+
+def _read_file(path: str) -> bytes:
     with open(path, 'rb') as f:
-        data = f.read()
-    return _to_rgb_array_from_bytes(data)
+        return f.read()
 
 
-def _save_upload(file_storage, prefix: str) -> str:
-    """Save uploaded file to uploads dir and return saved path."""
+def _read_bytes_from_path(path: str) -> bytes:
+    """Resolve an image path (absolute or relative to known roots) and read its bytes."""
+    if os.path.isabs(path):
+        try:
+            return _read_file(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f'Image not found: {path}') from None
+
+    cwd = os.getcwd()
+    resolved = _resolve_path(path, cwd)
+    try:
+        return _read_file(resolved)
+    except FileNotFoundError:
+        # The cached location went away; drop stale entries and search again
+        _resolve_path.cache_clear()
+    resolved = _resolve_path(path, cwd)
+    try:
+        return _read_file(resolved)
+    except FileNotFoundError:
+        raise FileNotFoundError(f'Image not found: {resolved}') from None
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize `obj` to UTF-8 JSON bytes, using orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _save_results(session_id: str, results: Dict[str, Any]) -> bytes:
+    """Persist results and return the serialized JSON for the response body."""
+    body = _dumps(results)
+    with open(os.path.join(RESULTS_DIR, f'{session_id}.json'), 'wb') as f:
+        f.write(body)
+    return body
+
+
+def _log_write_failure(save_path: str, fut: Future) -> None:
+    exc = fut.exception()
+    if exc is not None:
+        app.logger.error('Failed to save upload %s: %s', save_path, exc)
+
+
+def _save_upload(file_storage, data: bytes, prefix: str, session_id: str) -> None:
+    """Write already-read upload bytes to the uploads dir in the background.
+
+    The write overlaps with decoding; failures are logged rather than raised.
+    """
     ext = ''
     if hasattr(file_storage, 'filename') and file_storage.filename:
         _, ext = os.path.splitext(file_storage.filename)
-    filename = f"{prefix}_{uuid.uuid4().hex}{ext or '.jpg'}"
+    filename = f"{prefix}_{session_id}{ext or '.jpg'}"
     save_path = os.path.join(UPLOAD_DIR, filename)
-    file_storage.save(save_path)
-    return save_path
-
-
-def _to_data_url(img: np.ndarray, fmt: str = 'JPEG') -> str:
-    """Convert RGB float32 [0,1] array to a Base64 data URL string."""
-    if HAS_PIL:
-        im = Image.fromarray(np.clip(img * 255.0, 0, 255).astype(np.uint8), mode='RGB')
-        buf = io.BytesIO()
-        im.save(buf, format=fmt)
-        b64 = base64.b64encode(buf.getvalue()).decode('ascii')
-        mime = 'image/jpeg' if fmt.upper() == 'JPEG' else 'image/png'
-        return f"data:{mime};base64,{b64}"
-    else:
-        # Minimal fallback using OpenCV
-        if not HAS_CV2:
-            raise RuntimeError('Cannot encode image without PIL or OpenCV')
-        bgr = cv2.cvtColor((img * 255.0).astype(np.uint8), cv2.COLOR_RGB2BGR)
-        ok, buf = cv2.imencode('.jpg', bgr)
-        if not ok:
-            raise ValueError('Failed to encode image')
-        b64 = base64.b64encode(buf.tobytes()).decode('ascii')
-        return f"data:image/jpeg;base64,{b64}"
+    fut = _IO_POOL.submit(_write_bytes, save_path, data)
+    fut.add_done_callback(functools.partial(_log_write_failure, save_path))
+
+
+def _downsample_for_analysis(img: np.ndarray) -> np.ndarray:
+    """Shrink `img` so its long edge is at most ANALYSIS_MAX_EDGE pixels."""
+    h, w = img.shape[:2]
+    long_edge = max(h, w)
+    if ANALYSIS_MAX_EDGE <= 0 or long_edge <= ANALYSIS_MAX_EDGE:
+        return img
+    scale = ANALYSIS_MAX_EDGE / long_edge
+    new_size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
+
+
+def _sniff_mime(data: bytes, hint: Optional[str] = None) -> Optional[str]:
+    """Identify a browser-displayable image format from its magic bytes.
+
+    `hint` (the declared Content-Type or a type guessed from the extension)
+    only breaks ties for the weak two-byte BMP signature.
+    """
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:2] == b'BM' and len(data) >= 14:
+        (size,) = struct.unpack('<I', data[2:6])
+        if hint == 'image/bmp' or size == len(data):
+            return 'image/bmp'
+    return None
+
+
+def _bytes_to_data_url(data: bytes, hint: Optional[str] = None) -> Optional[str]:
+    """Embed already-encoded image bytes as a data URL, skipping a re-encode.
+
+    The MIME type comes from the bytes themselves (see `_sniff_mime`), so
+    mislabelled uploads are embedded correctly. Returns None for formats
+    browsers cannot display, so the caller can fall back to `_to_data_url`.
+    """
+    mime = _sniff_mime(data, hint)
+    if mime is None:
+        return None
+    b64 = base64.b64encode(data).decode('ascii')
+    return f"data:{mime};base64,{b64}"
+
+
+def _decode_with_preview(item: Tuple[bytes, Optional[str]]) -> Tuple[np.ndarray, Optional[str]]:
+    """Decode `(data, mime_hint)` and build its embedded data URL, if possible.
+
+    Reduced-scale decoding is only used when the original bytes can be
+    embedded; otherwise the decoded array is re-encoded as the preview and
+    must stay at full resolution.
+    """
+    data, hint = item
+    preview = _bytes_to_data_url(data, hint)
+    return _to_rgb_array_from_bytes(data, allow_reduced=preview is not None), preview
+
+
+def _to_data_url(img: np.ndarray) -> str:
+    """Convert an RGB array (uint8, or float32 in [0,1]) to a JPEG Base64 data URL string."""
+    if img.dtype != np.uint8:
+        img = np.clip(img * 255.0, 0, 255).astype(np.uint8)
+    bgr = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    ok, buf = cv2.imencode('.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise ValueError('Failed to encode image')
+    b64 = base64.b64encode(buf.tobytes()).decode('ascii')
+    return f"data:image/jpeg;base64,{b64}"
 
 
 # ----------------------------------------------------------------------------
 # Vegetation indices (visible approximations for RGB)
 # ----------------------------------------------------------------------------
 
-def _compute_indices(rgb: np.ndarray) -> Dict[str, np.ndarray]:
-    """Compute vegetation index rasters from an RGB image (float32 [0,1]).
+def _to_float_planes(rgb: np.ndarray) -> np.ndarray:
+    """Convert interleaved uint8 RGB (H, W, 3) to float32 planes (3, H, W) in [0, 1].
 
-    Visible-band approximations:
-    - vNDVI ≈ (G - R) / (G + R)
-    - EVI   ≈ 2.5 * (G - R) / (G + 6*R - 7.5*B + 1)
-    - NDWI  ≈ (G - B) / (G + B)
-    - SAVI  ≈ 1.5 * (G - R) / (G + R + 0.5)
-    - FVC   derived from NDVI (clamped 0..1)
-    - LAI   derived from FVC: -ln(1 - FVC + EPS)
+    Scaling and the HWC -> CHW transpose happen in one pass, so the fallback
+    paths operate on contiguous R/G/B arrays instead of stride-3 views.
     """
-    R = rgb[..., 0]
-    G = rgb[..., 1]
-    B = rgb[..., 2]
+    planes = np.empty((3,) + rgb.shape[:2], dtype=np.float32)
+    np.multiply(rgb.transpose(2, 0, 1), INV_255, out=planes)
+    return planes
+
+
+def _compute_indices_np(rgb: np.ndarray) -> Dict[str, np.ndarray]:
+    """NumPy fallback for `_compute_indices` (one temporary per operation)."""
+    R, G, B = _to_float_planes(rgb)
 
     vndvi = (G - R) / (G + R + EPS)
     evi = 2.5 * (G - R) / (G + 6.0 * R - 7.5 * B + 1.0 + EPS)
@@ -175,71 +394,215 @@ def _compute_indices(rgb: np.ndarray) -> Dict[str, np.ndarray]:
     fvc = np.clip((vndvi - ndvi_soil) / (ndvi_veg - ndvi_soil + EPS), 0.0, 1.0) ** 2
 
     # LAI from FVC (simple Beer-Lambert approximation)
-    lai = -np.log(1.0 - np.clip(fvc, 0.0, 0.99) + EPS)
+    lai = -np.log(1.0 - np.minimum(fvc, 0.99) + EPS)
 
+    # With non-negative R, G, B, NDVI/NDWI are bounded by construction and FVC
+    # is the square of a [0, 1] value, so only EVI, SAVI and LAI need clipping
     return {
-        'ndvi': np.clip(vndvi, -1.0, 1.0),
+        'ndvi': vndvi,
         'evi': np.clip(evi, -1.0, 1.0),
-        'ndwi': np.clip(ndwi, -1.0, 1.0),
+        'ndwi': ndwi,
         'savi': np.clip(savi, -1.0, 1.0),
-        'fvc': np.clip(fvc, 0.0, 1.0),
+        'fvc': fvc,
         'lai': np.clip(lai, 0.0, 6.0),  # cap to a reasonable LAI range
     }
 
 
-def _metrics_summary(arr: np.ndarray) -> Dict[str, float]:
-    return {
-        'mean': float(np.nanmean(arr)),
-        'std': float(np.nanstd(arr)),
-        'max': float(np.nanmax(arr)),
-        'min': float(np.nanmin(arr)),
-    }
+def _compute_indices_ne(rgb: np.ndarray) -> Dict[str, np.ndarray]:
+    """numexpr fallback for `_compute_indices`: one fused, threaded pass per index.
+
+    Fractional constants are scaled to integers (e.g. 2.5 * x / d becomes
+    5 * x / (2 * d)) because float literals would upcast numexpr to float64.
+    """
+    R, G, B = _to_float_planes(rgb)
+    env = {'R': R, 'G': G, 'B': B, 'eps': np.float32(EPS)}
+
+    ndvi = ne.evaluate('(G - R) / (G + R + eps)', local_dict=env)
+    evi = ne.evaluate('5 * (G - R) / (2 * G + 12 * R - 15 * B + 2 + 2 * eps)', local_dict=env)
+    ndwi = ne.evaluate('(G - B) / (G + B + eps)', local_dict=env)
+    savi = ne.evaluate('3 * (G - R) / (2 * G + 2 * R + 1 + 2 * eps)', local_dict=env)
+    # NDVI/NDWI are already within [-1, 1] for non-negative inputs
+    for arr in (evi, savi):
+        np.clip(arr, -1.0, 1.0, out=arr)
+
+    # Same soil/veg anchors as the NumPy path: (ndvi - 0.2) / 0.66
+    fvc = ne.evaluate('(50 * ndvi - 10) / (33 + 50 * eps)', local_dict={'ndvi': ndvi, 'eps': env['eps']})
+    np.clip(fvc, 0.0, 1.0, out=fvc)
+    fvc *= fvc
+
+    lai = ne.evaluate(
+        '-log(1 - where(fvc > cap, cap, fvc) + eps)',
+        local_dict={'fvc': fvc, 'cap': np.float32(0.99), 'eps': env['eps']},
+    )
+    np.clip(lai, 0.0, 6.0, out=lai)
+
+    return {'ndvi': ndvi, 'evi': evi, 'ndwi': ndwi, 'savi': savi, 'fvc': fvc, 'lai': lai}
+
+
+# Order of the index rasters/statistics produced by the kernels below
+INDEX_KEYS = ('ndvi', 'evi', 'ndwi', 'savi', 'fvc', 'lai')
+
+if HAS_NUMBA:
+    # Explicit signatures compile eagerly at import; cache=True persists the
+    # machine code under __pycache__ so restarts skip compilation entirely
+    @njit('f8[:, ::1](u1[:, :, ::1], f4[:, :, ::1], b1)', parallel=True, nogil=True, fastmath=True, cache=True)
+    def _indices_stats_nb(rgb, out, write_rasters):
+        """Fused kernel: read each pixel once, accumulate per-index statistics
+        and, if `write_rasters`, store the six index rasters into `out`.
+
+        Returns a (6, 4) array of (mean, std, max, min) in INDEX_KEYS order.
+        """
+        h, w = rgb.shape[0], rgb.shape[1]
+        # Per-row (sum, sum of squares, min, max) so rows reduce independently
+        acc = np.empty((h, 6, 4))
+        for y in prange(h):
+            vals = np.empty(6, dtype=np.float32)
+            row = acc[y]
+            for k in range(6):
+                row[k, 0] = 0.0
+                row[k, 1] = 0.0
+                row[k, 2] = np.inf
+                row[k, 3] = -np.inf
+            for x in range(w):
+                # Normalize uint8 -> [0, 1] per pixel instead of a separate pass
+                r = rgb[y, x, 0] * INV_255
+                g = rgb[y, x, 1] * INV_255
+                b = rgb[y, x, 2] * INV_255
+                gmr = g - r
+                gpr = g + r
+
+                ndvi_val = min(max(gmr / (gpr + EPS), -1.0), 1.0)
+                vals[0] = ndvi_val
+                vals[1] = min(max(2.5 * gmr / (g + 6.0 * r - 7.5 * b + 1.0 + EPS), -1.0), 1.0)
+                vals[2] = min(max((g - b) / (g + b + EPS), -1.0), 1.0)
+                vals[3] = min(max(1.5 * gmr / (gpr + 0.5 + EPS), -1.0), 1.0)
+
+                # FVC/LAI use the same soil/veg anchors as the NumPy path
+                fvc_raw = (ndvi_val - 0.2) / (0.66 + EPS)
+                fvc_val = min(max(fvc_raw, 0.0), 1.0)
+                fvc_val = fvc_val * fvc_val
+                vals[4] = fvc_val
+                lai_val = -math.log(1.0 - min(fvc_val, 0.99) + EPS)
+                vals[5] = min(max(lai_val, 0.0), 6.0)
+
+                for k in range(6):
+                    v = vals[k]
+                    row[k, 0] += v
+                    row[k, 1] += v * v
+                    row[k, 2] = min(row[k, 2], v)
+                    row[k, 3] = max(row[k, 3], v)
+                    if write_rasters:
+                        out[k, y, x] = v
+
+        n = h * w
+        stats = np.empty((6, 4))
+        for k in range(6):
+            s = 0.0
+            s2 = 0.0
+            mn = np.inf
+            mx = -np.inf
+            for y in range(h):
+                s += acc[y, k, 0]
+                s2 += acc[y, k, 1]
+                mn = min(mn, acc[y, k, 2])
+                mx = max(mx, acc[y, k, 3])
+            mean = s / n
+            stats[k, 0] = mean
+            stats[k, 1] = math.sqrt(max(s2 / n - mean * mean, 0.0))
+            stats[k, 2] = mx
+            stats[k, 3] = mn
+        return stats
+
+
+def _metrics_summary(arr: np.ndarray) -> Tuple[float, float, float, float]:
+    """(mean, std, max, min) of a raster, used by the non-Numba paths."""
+    # Index rasters are clipped from finite inputs, so no NaN handling is needed
+    return float(arr.mean()), float(arr.std()), float(arr.max()), float(arr.min())
+
+
+def _compute_indices_and_stats(
+    rgb: np.ndarray, want_rasters: bool = False
+) -> Tuple[Dict[str, float], Optional[Dict[str, np.ndarray]]]:
+    """Compute per-index statistics and, optionally, the index rasters.
+
+    With Numba this is a single fused pass; when `want_rasters` is False the
+    kernel skips the raster stores entirely and nothing H x W is allocated.
+    """
+    if HAS_NUMBA:
+        rgb = np.ascontiguousarray(rgb, dtype=np.uint8)
+        h, w = rgb.shape[:2]
+        shape = (len(INDEX_KEYS), h, w) if want_rasters else (len(INDEX_KEYS), 1, 1)
+        out = np.empty(shape, dtype=np.float32)
+        with _KERNEL_LOCK:
+            stats = _indices_stats_nb(rgb, out, want_rasters)
+        rasters = dict(zip(INDEX_KEYS, out)) if want_rasters else None
+    else:
+        rasters = _compute_indices_ne(rgb) if HAS_NUMEXPR else _compute_indices_np(rgb)
+        stats = [_metrics_summary(rasters[key]) for key in INDEX_KEYS]
+        if not want_rasters:
+            rasters = None
 
+    summary: Dict[str, float] = {}
+    for key, (mean, std, mx, mn) in zip(INDEX_KEYS, stats):
+        summary[f'{key}_mean'] = float(mean)
+        summary[f'{key}_std'] = float(std)
+        summary[f'{key}_max'] = float(mx)
+        summary[f'{key}_min'] = float(mn)
+    return summary, rasters
 
-def _compute_metrics(rgb: np.ndarray) -> Dict[str, float]:
-    idx = _compute_indices(rgb)
-    out: Dict[str, float] = {}
-    for key, data in idx.items():
-        s = _metrics_summary(data)
-        out[f'{key}_mean'] = s['mean']
-        out[f'{key}_std'] = s['std']
-        out[f'{key}_max'] = s['max']
-        out[f'{key}_min'] = s['min']
-    return out
+
+def _compute_indices(rgb: np.ndarray) -> Dict[str, np.ndarray]:
+    """Compute vegetation index rasters from an RGB image (uint8, HWC).
+
+    Visible-band approximations:
+    - vNDVI ≈ (G - R) / (G + R)
+    - EVI   ≈ 2.5 * (G - R) / (G + 6*R - 7.5*B + 1)
+    - NDWI  ≈ (G - B) / (G + B)
+    - SAVI  ≈ 1.5 * (G - R) / (G + R + 0.5)
+    - FVC   derived from NDVI (clamped 0..1)
+    - LAI   derived from FVC: -ln(1 - FVC + EPS)
+    """
+    _, rasters = _compute_indices_and_stats(rgb, want_rasters=True)
+    return rasters
+
+
+def _compute_metrics(
+    rgb: np.ndarray, want_rasters: bool = False
+) -> Tuple[Dict[str, float], Optional[Dict[str, np.ndarray]]]:
+    """Return (stats, rasters) for an image; rasters is None unless requested."""
+    # Full resolution is only kept for the data URL previews
+    return _compute_indices_and_stats(_downsample_for_analysis(rgb), want_rasters)
+
+
+# Metrics whose std changes count as noise in the confidence heuristic
+_NOISE_KEYS = ('ndvi_std', 'evi_std', 'fvc_std', 'lai_std')
+
+# Impact categories in 15-point bands starting at 35 (see _impact_analysis)
+_CATEGORIES = ('Very Poor', 'Poor', 'Moderate', 'Good', 'Excellent')
 
 
 def _impact_analysis(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, Any]:
-    def change_pct(metric: str) -> float:
-        b = before.get(f'{metric}_mean', 0.0)
-        a = after.get(f'{metric}_mean', 0.0)
-        return float(((a - b) / (abs(b) + EPS)) * 100.0)
+    def change_pct(key: str) -> float:
+        b = before[key]
+        return float(((after[key] - b) / (abs(b) + EPS)) * 100.0)
 
-    ndvi_ch = change_pct('ndvi')
-    evi_ch = change_pct('evi')
-    fvc_ch = change_pct('fvc')
-    lai_ch = change_pct('lai')
+    ndvi_ch = change_pct('ndvi_mean')
+    evi_ch = change_pct('evi_mean')
+    fvc_ch = change_pct('fvc_mean')
+    lai_ch = change_pct('lai_mean')
 
     weighted = 0.4 * ndvi_ch + 0.2 * evi_ch + 0.2 * fvc_ch + 0.2 * lai_ch
-    impact_score = float(np.clip(50.0 + weighted / 2.0, 0.0, 100.0))
-
-    if impact_score >= 80:
-        category = 'Excellent'
-    elif impact_score >= 65:
-        category = 'Good'
-    elif impact_score >= 50:
-        category = 'Moderate'
-    elif impact_score >= 35:
-        category = 'Poor'
-    else:
-        category = 'Very Poor'
+    impact_score = min(max(50.0 + weighted / 2.0, 0.0), 100.0)
+
+    # <35 Very Poor, <50 Poor, <65 Moderate, <80 Good, else Excellent
+    band = int((impact_score - 5.0) // 15.0) - 1
+    category = _CATEGORIES[min(max(band, 0), len(_CATEGORIES) - 1)]
 
     # Confidence heuristic based on image size and metric stability
     conf = 70.0
     # Penalize very noisy changes
-    noise = sum(
-        abs(before.get(f'{m}_std', 0) - after.get(f'{m}_std', 0)) for m in ['ndvi', 'evi', 'fvc', 'lai']
-    )
-    conf = float(np.clip(conf - noise * 5.0, 50.0, 95.0))
+    noise = sum(abs(before[k] - after[k]) for k in _NOISE_KEYS)
+    conf = min(max(conf - noise * 5.0, 50.0), 95.0)
 
     return {
         'impact_score': impact_score,
@@ -253,14 +616,39 @@ def _impact_analysis(before: Dict[str, float], after: Dict[str, float]) -> Dict[
     }
 
 
-def _build_results(before_rgb: np.ndarray, after_rgb: np.ndarray) -> Dict[str, Any]:
-    before_metrics = _compute_metrics(before_rgb)
-    after_metrics = _compute_metrics(after_rgb)
+def _map_pair(fn, first, second) -> Tuple[Any, Any]:
+    """Apply `fn` to two independent inputs, running the first on the pool.
+
+    OpenCV and the Numba kernels release the GIL, so this gives real
+    parallelism for the before/after images.
+    """
+    fut = _POOL.submit(fn, first)
+    second_out = fn(second)
+    return fut.result(), second_out
+
+
+def _build_results(
+    before_rgb: np.ndarray,
+    after_rgb: np.ndarray,
+    before_image: Optional[str] = None,
+    after_image: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Assemble the analysis response.
+
+    `before_image`/`after_image` are data URLs of the original bytes when
+    available; otherwise the decoded arrays are re-encoded.
+    """
+    (before_metrics, _), (after_metrics, _) = _map_pair(_compute_metrics, before_rgb, after_rgb)
+    if before_image is None and after_image is None:
+        before_image, after_image = _map_pair(_to_data_url, before_rgb, after_rgb)
+    else:
+        before_image = before_image or _to_data_url(before_rgb)
+        after_image = after_image or _to_data_url(after_rgb)
 
     results: Dict[str, Any] = {
-        'timestamp': datetime.utcnow().isoformat() + 'Z',
-        'before_image': _to_data_url(before_rgb),
-        'after_image': _to_data_url(after_rgb),
+        'timestamp': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        'before_image': before_image,
+        'after_image': after_image,
         'before_metrics': before_metrics,
         'after_metrics': after_metrics,
         'impact_analysis': _impact_analysis(before_metrics, after_metrics),
@@ -269,6 +657,21 @@ def _build_results(before_rgb: np.ndarray, after_rgb: np.ndarray) -> Dict[str, A
     return results
 
 
+# Guards every parallel kernel launch; a no-op unless replaced below
+_KERNEL_LOCK: Any = contextlib.nullcontext()
+
+if HAS_NUMBA:
+    # Run the kernels once at import so the first request doesn't pay for
+    # loading them or starting Numba's thread pool
+    _compute_metrics(np.zeros((4, 4, 3), dtype=np.uint8), want_rasters=True)
+
+    # Numba's fallback 'workqueue' threading layer terminates the process when
+    # parallel kernels are launched from several threads at once (within or
+    # across requests); serialize launches unless TBB/OpenMP is in use
+    if threading_layer() == 'workqueue':
+        _KERNEL_LOCK = threading.Lock()
+
+
 # ----------------------------------------------------------------------------
 # Routes
 # ----------------------------------------------------------------------------
@@ -297,25 +700,30 @@ def analyze_uploads() -> Any:
     if not before_file or not after_file:
         return jsonify({'status': 'error', 'error': 'Missing files: before and/or after'}), 400
 
+    before_bytes = before_file.read()
+    after_bytes = after_file.read()
+
+    # One id per request names both the saved uploads and the results file
+    session_id = uuid.uuid4().hex
+
     # Save uploads (optional but helpful for tracing)
-    before_path = _save_upload(before_file, 'before')
-    after_path = _save_upload(after_file, 'after')
+    _save_upload(before_file, before_bytes, 'before', session_id)
+    _save_upload(after_file, after_bytes, 'after', session_id)
 
     try:
-        with open(before_path, 'rb') as fb:
-            before_rgb = _to_rgb_array_from_bytes(fb.read())
-        with open(after_path, 'rb') as fa:
-            after_rgb = _to_rgb_array_from_bytes(fa.read())
+        (before_rgb, before_image), (after_rgb, after_image) = _map_pair(
+            _decode_with_preview,
+            (before_bytes, before_file.mimetype),
+            (after_bytes, after_file.mimetype),
+        )
 
-        results = _build_results(before_rgb, after_rgb)
-        session_id = uuid.uuid4().hex
+        results = _build_results(before_rgb, after_rgb, before_image, after_image)
         results['session_id'] = session_id
 
         # Persist results
-        with open(os.path.join(RESULTS_DIR, f'{session_id}.json'), 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        body = _save_results(session_id, results)
 
-        return jsonify(results)
+        return app.response_class(body, mimetype='application/json')
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
@@ -329,17 +737,20 @@ def analyze_by_paths() -> Any:
         if not before_path or not after_path:
             return jsonify({'status': 'error', 'error': 'Missing before_path or after_path'}), 400
 
-        before_rgb = _read_image_from_path(before_path)
-        after_rgb = _read_image_from_path(after_path)
+        before_bytes, after_bytes = _map_pair(_read_bytes_from_path, before_path, after_path)
+        (before_rgb, before_image), (after_rgb, after_image) = _map_pair(
+            _decode_with_preview,
+            (before_bytes, mimetypes.guess_type(before_path)[0]),
+            (after_bytes, mimetypes.guess_type(after_path)[0]),
+        )
 
-        results = _build_results(before_rgb, after_rgb)
+        results = _build_results(before_rgb, after_rgb, before_image, after_image)
         session_id = uuid.uuid4().hex
         results['session_id'] = session_id
 
-        with open(os.path.join(RESULTS_DIR, f'{session_id}.json'), 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        body = _save_results(session_id, results)
 
-        return jsonify(results)
+        return app.response_class(body, mimetype='application/json')
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
@@ -349,12 +760,20 @@ def get_results(session_id: str) -> Any:
     path = os.path.join(RESULTS_DIR, f'{session_id}.json')
     if not os.path.exists(path):
         return jsonify({'status': 'error', 'error': 'Session not found'}), 404
-    with open(path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    return jsonify(data)
+    # Stored results are already JSON; serve them without a parse/re-encode
+    with open(path, 'rb') as f:
+        data = f.read()
+    return app.response_class(data, mimetype='application/json')
 
 
 if __name__ == '__main__':
     # Allow PORT override via env (default 5000)
     port = int(os.getenv('AI_SERVER_PORT', '5000'))
-    app.run(host='0.0.0.0', port=port, debug=False)
+    threads = int(os.getenv('AI_SERVER_THREADS', '8'))
+    try:
+        from waitress import serve  # type: ignore
+    except ImportError:
+        app.logger.warning('waitress not installed; falling back to the Flask development server')
+        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+    else:
+        serve(app, host='0.0.0.0', port=port, threads=threads)